@@ -12,13 +12,15 @@ develop a new k8s charm using the Operator Framework:
     https://discourse.charmhub.io/t/4208
 """
 
+import hashlib
 import logging
 import os
 import pathlib
+import re
 from base64 import b64decode
 from binascii import Error as Base64Error
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union, cast
 
 import yaml
 from charmhelpers.core import hookenv
@@ -33,6 +35,7 @@ from ops.charm import (
     UpdateStatusEvent,
     UpgradeCharmEvent,
 )
+from ops.framework import StoredState
 from ops.main import main
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, ModelError
 from packaging import version
@@ -44,6 +47,11 @@ from prometheus_interface.operator import (
 
 from exporter import ExporterConfig, ExporterConfigError, ExporterSnap
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: nocover
+    from yaml import SafeLoader as _SafeLoader  # type: ignore[assignment]
+
 # Log messages can be retrieved using juju debug-log
 logger = logging.getLogger(__name__)
 
@@ -78,7 +86,7 @@ def evaluate_status(func: Callable) -> Callable:
     return wrapper
 
 
-class PrometheusJujuExporterCharm(CharmBase):
+class PrometheusJujuExporterCharm(CharmBase):  # pylint: disable=too-many-instance-attributes
     """Charm the service."""
 
     # Mapping between charm and snap configuration options
@@ -95,13 +103,20 @@ class PrometheusJujuExporterCharm(CharmBase):
         "match-interfaces": "detection.match_interfaces",
     }
 
+    _stored = StoredState()
+
     def __init__(self, *args: Any) -> None:
         """Initialize charm."""
         super().__init__(*args)
+        # Digests of charm config inputs, applied exporter config and the opened port persist
+        # across hooks
+        self._stored.set_default(input_hash=None, config_hash=None, last_port=None)
         self.exporter = ExporterSnap()
         self.prometheus_target = PrometheusScrapeTarget(self, "prometheus-scrape")
         self._snap_path: Optional[str] = None
         self._snap_path_set = False
+        self._ca_cert_cache: Optional[str] = None
+        self._ca_cert_source: Optional[str] = None
 
         self.framework.observe(self.on.config_changed, self._on_config_changed)
         self.framework.observe(self.on.install, self._on_install)
@@ -125,7 +140,9 @@ class PrometheusJujuExporterCharm(CharmBase):
         self.grafana_dashboard_provider = GrafanaDashboardProvider(
             self, relation_name="grafana-k8s-dashboard"
         )
-        self.grafana_dashboard_provider._reinitialize_dashboard_data(inject_dropdowns=False)
+        # Dashboards are only sent over existing relations, skip their reload otherwise
+        if self.model.relations["grafana-k8s-dashboard"]:
+            self.grafana_dashboard_provider._reinitialize_dashboard_data(inject_dropdowns=False)
 
     @property
     def snap_path(self) -> Optional[str]:
@@ -186,7 +203,7 @@ class PrometheusJujuExporterCharm(CharmBase):
         """Return the version of the current controller."""
         agent_conf_path = pathlib.Path(hookenv.charm_dir()).joinpath("../agent.conf")
         with open(agent_conf_path, "r", encoding="utf-8") as conf_file:
-            agent_conf = yaml.safe_load(conf_file)
+            agent_conf = yaml.load(conf_file, Loader=_SafeLoader)
 
         controller_version = agent_conf.get("upgradedToVersion")
         if not controller_version:
@@ -200,8 +217,20 @@ class PrometheusJujuExporterCharm(CharmBase):
         CA certificate can be directly configured by `controller-ca-cert` option, if it is, the
         value is directly returned by this method. If it is not defined, a CA cert used by the
         controller that deploys this unit will be returned.
+
+        Result is cached for the lifetime of the charm instance and recomputed only if the
+        `controller-ca-cert` option changes.
         """
         explicit_cert = self.config.get("controller-ca-cert", "")
+        if self._ca_cert_cache is not None and explicit_cert == self._ca_cert_source:
+            return self._ca_cert_cache
+
+        self._ca_cert_cache = self._load_controller_ca_cert(explicit_cert)
+        self._ca_cert_source = explicit_cert
+        return self._ca_cert_cache
+
+    def _load_controller_ca_cert(self, explicit_cert: str) -> str:
+        """Decode CA certificate from config option or read it from unit's agent.conf."""
         if explicit_cert:
             try:
                 return b64decode(explicit_cert, validate=True).decode(encoding="ascii")
@@ -215,7 +244,7 @@ class PrometheusJujuExporterCharm(CharmBase):
 
         agent_conf_path = pathlib.Path(hookenv.charm_dir()).joinpath("../agent.conf")
         with open(agent_conf_path, "r", encoding="utf-8") as conf_file:
-            agent_conf = yaml.safe_load(conf_file)
+            agent_conf = yaml.load(conf_file, Loader=_SafeLoader)
 
         ca_cert = agent_conf.get("cacert")
         if not ca_cert:
@@ -227,22 +256,30 @@ class PrometheusJujuExporterCharm(CharmBase):
         self,
     ) -> Dict[str, Union[Dict[str, Union[List[str], str, None]], str, None]]:
         """Generate exporter service config based on the values from charm config."""
+        charm_config = dict(self.config)
         config = ExporterConfig(
-            debug=self.config.get("debug"),
-            customer=self.config.get("customer"),
-            cloud=self.config.get("cloud-name"),
-            controller=self.config.get("controller-url"),
+            debug=charm_config.get("debug"),
+            customer=charm_config.get("customer"),
+            cloud=charm_config.get("cloud-name"),
+            controller=charm_config.get("controller-url"),
             ca_cert=self.get_controller_ca_cert(),
-            user=self.config.get("juju-user"),
-            password=self.config.get("juju-password"),
-            interval=self.config.get("scrape-interval"),
-            port=self.config.get("scrape-port"),
-            prefixes=self.config.get("virtual-macs"),
-            match_interfaces=self.config.get("match-interfaces"),
+            user=charm_config.get("juju-user"),
+            password=charm_config.get("juju-password"),
+            interval=charm_config.get("scrape-interval"),
+            port=charm_config.get("scrape-port"),
+            prefixes=charm_config.get("virtual-macs"),
+            match_interfaces=charm_config.get("match-interfaces"),
         )
 
         return config.render()
 
+    def config_input_digest(self) -> str:
+        """Return digest of charm config options that determine exporter configuration."""
+        charm_config = dict(self.config)
+        values = [charm_config.get(option) for option in self.SNAP_CONFIG_MAP]
+        values.append(self.get_controller_ca_cert())
+        return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).hexdigest()
+
     def reconfigure_scrape_target(self) -> None:
         """Update scrape target configuration in related Prometheus application.
 
@@ -263,7 +300,9 @@ class PrometheusJujuExporterCharm(CharmBase):
 
     def reconfigure_open_ports(self) -> None:
         """Update ports that juju shows as 'opened' in units' status."""
-        new_port = self.config["scrape-port"]
+        new_port = int(self.config["scrape-port"])
+        if new_port == cast(Optional[int], self._stored.last_port):
+            return
 
         for port_spec in hookenv.opened_ports():
             old_port, protocol = port_spec.split("/")
@@ -272,10 +311,14 @@ class PrometheusJujuExporterCharm(CharmBase):
 
         logger.debug("Setting port %s as opened.", new_port)
         hookenv.open_port(new_port)
+        self._stored.last_port = new_port
 
     def _on_install(self, _: Optional[InstallEvent]) -> None:
         """Install prometheus-juju-exporter snap."""
         self.unit.status = MaintenanceStatus("Installing charm software.")
+        # Freshly installed snap must always receive its configuration
+        self._stored.input_hash = None
+        self._stored.config_hash = None
         try:
             self.exporter.install(self.snap_path, self.snap_channel)
         except snap.CouldNotAcquireLockException as exc:
@@ -301,18 +344,26 @@ class PrometheusJujuExporterCharm(CharmBase):
     def _on_config_changed(self, _: Optional[ConfigChangedEvent]) -> None:
         """Handle changed configuration."""
         logger.info("Processing new charm configuration.")
-        exporter_config = self.generate_exporter_config()
-        try:
-            self.exporter.apply_config(exporter_config)
-        except ExporterConfigError as exc:
-            # Replace snap config names with their charm equivalents
-            err_msg = str(exc)
-            for charm_option, snap_option in self.SNAP_CONFIG_MAP.items():
-                err_msg = err_msg.replace(snap_option, charm_option)
-
-            logger.error(err_msg)
-            self.unit.status = BlockedStatus("Invalid configuration. Please see logs.")
-            return
+        input_hash = self.config_input_digest()
+        stored_input_hash = cast(Optional[str], self._stored.input_hash)
+        if input_hash == stored_input_hash and self.exporter.is_running():
+            logger.info("Exporter configuration is up to date.")
+        else:
+            exporter_config = self.generate_exporter_config()
+            try:
+                self._stored.config_hash = self.exporter.apply_config(
+                    exporter_config, cast(Optional[str], self._stored.config_hash)
+                )
+            except ExporterConfigError as exc:
+                # Replace snap config names with their charm equivalents
+                err_msg = _SNAP_OPTION_RE.sub(
+                    lambda match: _SNAP_TO_CHARM_OPTION[match.group(0)], str(exc)
+                )
+
+                logger.error(err_msg)
+                self.unit.status = BlockedStatus("Invalid configuration. Please see logs.")
+                return
+            self._stored.input_hash = input_hash
 
         self.reconfigure_scrape_target()
         self.reconfigure_open_ports()
@@ -326,5 +377,16 @@ class PrometheusJujuExporterCharm(CharmBase):
         """Assess unit's status."""
 
 
+# Reverse mapping from snap to charm configuration options and a pattern that matches any
+# snap option. Longer options are matched first, so no option can shadow another one.
+_SNAP_TO_CHARM_OPTION = {
+    snap_option: charm_option
+    for charm_option, snap_option in PrometheusJujuExporterCharm.SNAP_CONFIG_MAP.items()
+}
+_SNAP_OPTION_RE = re.compile(
+    "|".join(re.escape(option) for option in sorted(_SNAP_TO_CHARM_OPTION, key=len, reverse=True))
+)
+
+
 if __name__ == "__main__":  # pragma: nocover
     main(PrometheusJujuExporterCharm)
@@ -6,20 +6,46 @@
 
 Module focused on handling operations related to prometheus-juju-exporter snap.
 """
+import hashlib
 import logging
 import os
 import subprocess
-from typing import Any, Dict, List, NamedTuple, Optional, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
 
 import yaml
 from charmhelpers.core import host as ch_host
 from charmhelpers.fetch import snap
 from packaging import version
 
+try:
+    from yaml import CSafeDumper as _SafeDumper
+except ImportError:  # pragma: nocover
+    from yaml import SafeDumper as _SafeDumper  # type: ignore[assignment]
+
 # Log messages can be retrieved using juju debug-log
 logger = logging.getLogger(__name__)
 
 
+def _walk(config: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    """Return value stored under nested :path in the config dict or empty dict if not found."""
+    value: Any = config
+    for identifier in path:
+        value = value.get(identifier, {})
+    return value
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Return value of an int or a string with optionally signed decimal number, else None."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        digits = value[1:] if value[:1] in ("+", "-") else value
+        if digits.isdecimal():
+            return int(value)
+    return None
+
+
 class ExporterConfigError(Exception):
     """Indicates problem with configuration of exporter service."""
 
@@ -96,28 +122,29 @@ class ExporterSnap:
 
     SNAP_NAME = "prometheus-juju-exporter"
     SNAP_CONFIG_PATH = f"/var/snap/{SNAP_NAME}/current/config.yaml"
+    SERVICE_NAME = f"snap.{SNAP_NAME}.{SNAP_NAME}.service"
     _SNAP_ACTIONS = [
         "stop",
         "start",
         "restart",
     ]
-    _REQUIRED_CONFIG = [
-        "customer.name",
-        "customer.cloud_name",
-        "juju.controller_endpoint",
-        "juju.controller_cacert",
-        "juju.username",
-        "juju.password",
-        "exporter.port",
-        "exporter.collect_interval",
-        "detection.virt_macs",
-        "detection.match_interfaces",
-    ]
+    _REQUIRED_CONFIG_PATHS = (
+        ("customer", "name"),
+        ("customer", "cloud_name"),
+        ("juju", "controller_endpoint"),
+        ("juju", "controller_cacert"),
+        ("juju", "username"),
+        ("juju", "password"),
+        ("exporter", "port"),
+        ("exporter", "collect_interval"),
+        ("detection", "virt_macs"),
+        ("detection", "match_interfaces"),
+    )
 
     @property
     def service_name(self) -> str:
         """Return name of the exporter's systemd service."""
-        return f"snap.{self.SNAP_NAME}.{self.SNAP_NAME}.service"
+        return self.SERVICE_NAME
 
     def install(
         self, snap_path: Optional[str] = None, snap_channel: str = "latest/stable"
@@ -144,43 +171,31 @@ class ExporterSnap:
 
     def _validate_required_options(self, config: Dict[str, Any]) -> List[str]:
         """Validate that config has all required options for snap to run."""
-        missing_options = []
-        for option in self._REQUIRED_CONFIG:
-            config_value = config
-            for identifier in option.split("."):
-                config_value = config_value.get(identifier, {})
-            if not config_value:
-                missing_options.append(option)
-
-        return missing_options
+        return [".".join(path) for path in self._REQUIRED_CONFIG_PATHS if not _walk(config, path)]
 
     @staticmethod
-    def _validate_option_values(config: Dict[str, Any]) -> str:
+    def _validate_option_values(config: Dict[str, Any]) -> List[str]:
         """Validate sane values for some of the config parameters where its feasible."""
-        errors = ""
+        errors = []
+        exporter_config = config.get("exporter") or {}
 
         # Verify that 'port' is number within valid port range.
-        try:
-            port = int(config["exporter"]["port"])
-            if not 0 < port < 65535:
-                errors += f"Port {port} is not valid port number.{os.linesep}"
-        except ValueError:
-            errors += f"Configuration option 'port' must be a number.{os.linesep}"
-        except KeyError:
-            pass  # Options was not in the config
+        raw_port = exporter_config.get("port")
+        if raw_port is not None:
+            port = _to_int(raw_port)
+            if port is None:
+                errors.append("Configuration option 'port' must be a number.")
+            elif not 0 < port < 65535:
+                errors.append(f"Port {port} is not valid port number.")
 
         # Verify that 'collect_interval' is positive number.
-        try:
-            collect_interval = int(config["exporter"]["collect_interval"])
-            if collect_interval < 1:
-                errors += (
-                    f"Configuration option 'collect_interval' must be a "
-                    f"positive number.{os.linesep}"
-                )
-        except ValueError:
-            errors += f"Configuration option 'collect_interval' must be a number.{os.linesep}"
-        except KeyError:
-            pass  # Options was not in the config
+        raw_collect_interval = exporter_config.get("collect_interval")
+        if raw_collect_interval is not None:
+            collect_interval = _to_int(raw_collect_interval)
+            if collect_interval is None:
+                errors.append("Configuration option 'collect_interval' must be a number.")
+            elif collect_interval < 1:
+                errors.append("Configuration option 'collect_interval' must be a positive number.")
 
         return errors
 
@@ -192,29 +207,63 @@ class ExporterSnap:
             ExporterConfigError: In case the config does not pass the validation process. For
                 example if the required fields are missing or values have unexpected format.
         """
-        errors = ""
+        errors = []
 
         missing_options = self._validate_required_options(config)
         if missing_options:
             missing_str = ", ".join(missing_options)
-            errors += f"Following config options are missing: {missing_str}{os.linesep}"
+            errors.append(f"Following config options are missing: {missing_str}")
 
-        errors += self._validate_option_values(config)
+        errors.extend(self._validate_option_values(config))
 
         if errors:
-            raise ExporterConfigError(errors)
+            raise ExporterConfigError(os.linesep.join(errors))
+
+    @staticmethod
+    def render_config(exporter_config: Dict[str, Any]) -> Tuple[bytes, str]:
+        """Serialize exporter config into utf-8 encoded yaml and compute digest of the result.
+
+        The digest is used only to detect configuration changes, it does not need to be
+        collision resistant.
+
+        :param exporter_config: config dictionary to be serialized
+        :returns: tuple of yaml-formatted config and its hex digest
+        """
+        config_data = yaml.dump(
+            exporter_config, Dumper=_SafeDumper, default_flow_style=False, encoding="utf-8"
+        )
+        config_hash = hashlib.blake2b(config_data, digest_size=16).hexdigest()
+        return config_data, config_hash
+
+    def apply_config(
+        self, exporter_config: Dict[str, Any], current_hash: Optional[str] = None
+    ) -> str:
+        """Update configuration file for exporter service.
+
+        If the rendered config matches the :current_hash and the exporter service is running,
+        config file is not rewritten and the service is not restarted. Validation is skipped
+        if the rendered config matches the :current_hash, as it was validated when applied.
+
+        :param exporter_config: config dictionary to be applied
+        :param current_hash: digest of the currently applied config, if known
+        :returns: digest of the applied config
+        """
+        config_data, config_hash = self.render_config(exporter_config)
+        if config_hash == current_hash and self.is_running():
+            logger.info("Exporter configuration did not change.")
+            return config_hash
 
-    def apply_config(self, exporter_config: Dict[str, Any]) -> None:
-        """Update configuration file for exporter service."""
         self.stop()
         logger.info("Updating exporter service configuration.")
-        self.validate_config(exporter_config)
+        if config_hash != current_hash:
+            self.validate_config(exporter_config)
 
-        with open(self.SNAP_CONFIG_PATH, "w", encoding="utf-8") as config_file:
-            yaml.safe_dump(exporter_config, config_file)
+        with open(self.SNAP_CONFIG_PATH, "wb") as config_file:
+            config_file.write(config_data)
 
         self.restart()
         logger.info("Exporter configuration updated.")
+        return config_hash
 
     @classmethod
     def version(cls) -> version.Version:
@@ -8,6 +8,7 @@ from base64 import b64decode
 from itertools import repeat
 from unittest import mock
 
+import ops.testing
 import pytest
 import yaml
 from ops.model import ActiveStatus, BlockedStatus
@@ -41,6 +42,27 @@ def test_charm_event_mapping(event_name, handler, harness, mocker):
     mocked_handler.assert_called_once()
 
 
+@pytest.mark.parametrize("related", [True, False])
+def test_grafana_dashboards_reinitialized_when_related(related, unit_hostname, mocker):
+    """Test that dashboard data are reloaded on charm init only if grafana is related."""
+    mocker.patch.object(charm.PrometheusScrapeTarget, "get_hostname", return_value=unit_hostname)
+    mock_reinitialize = mocker.patch.object(
+        charm.GrafanaDashboardProvider, "_reinitialize_dashboard_data"
+    )
+    ops.testing.SIMULATE_CAN_CONNECT = True
+    harness = ops.testing.Harness(charm.PrometheusJujuExporterCharm)
+    try:
+        if related:
+            harness.add_relation("grafana-k8s-dashboard", "grafana")
+
+        harness.begin()
+
+        assert mock_reinitialize.called is related
+    finally:
+        harness.cleanup()
+        ops.testing.SIMULATE_CAN_CONNECT = False
+
+
 @pytest.mark.parametrize(
     "resource_exists, resource_size, is_path_expected",
     [
@@ -168,6 +190,25 @@ def test_get_controller_ca_cert_from_file_fail(harness, mocker):
     open_mock.assert_called_once_with(agent_config_path, "r", encoding="utf-8")
 
 
+def test_get_controller_ca_cert_cached(harness, mocker):
+    """Test that CA cert is read from agent.conf only once unless the config option changes."""
+    charm_path = "/var/lib/juju/agents/unit-0/charm/"
+    agent_conf_content = yaml.safe_dump({"cacert": "CA DATA"}, indent=2)
+    mocker.patch.object(charm.hookenv, "charm_dir", return_value=charm_path)
+
+    with mock.patch("builtins.open", mock.mock_open(read_data=agent_conf_content)) as open_mock:
+        assert harness.charm.get_controller_ca_cert() == "CA DATA"
+        assert harness.charm.get_controller_ca_cert() == "CA DATA"
+
+    open_mock.assert_called_once()
+
+    ca_data = "VGhpcyBpcyB2YWxpZCBDQQ=="
+    with harness.hooks_disabled():
+        harness.update_config({"controller-ca-cert": ca_data})
+
+    assert harness.charm.get_controller_ca_cert() == b64decode(ca_data).decode(encoding="ascii")
+
+
 def test_get_controller_ca_cert_from_config_success(harness):
     """Test successfully parsing CA certificate from config option."""
     ca_data = "VGhpcyBpcyB2YWxpZCBDQQ=="
@@ -339,15 +380,31 @@ def test_reconfigure_open_ports(harness, mocker):
     mock_open_port.assert_called_once_with(new_port)
 
 
+def test_reconfigure_open_ports_unchanged(harness, mocker):
+    """Test that ports are not touched again if the scrape port did not change."""
+    mock_opened_ports = mocker.patch.object(charm.hookenv, "opened_ports", return_value=[])
+    mock_open_port = mocker.patch.object(charm.hookenv, "open_port")
+
+    harness.charm.reconfigure_open_ports()
+    harness.charm.reconfigure_open_ports()
+
+    mock_opened_ports.assert_called_once_with()
+    mock_open_port.assert_called_once_with(harness.charm.config["scrape-port"])
+
+
 def test_on_install_callback_success(harness, mocker):
     """Test handling of InstallEvent with '_on_install' callback."""
     exporter_install = mocker.patch.object(harness.charm.exporter, "install")
     mocker.patch.object(
         harness.charm, "get_controller_version", return_value=version.parse("2.9.42.2")
     )
+    harness.charm._stored.input_hash = "fedcba9876543210"
+    harness.charm._stored.config_hash = "0123456789abcdef"
     harness.charm._on_install(None)
     exporter_install.assert_called_once_with(harness.charm.snap_path, harness.charm.snap_channel)
     assert isinstance(harness.charm.unit.status, charm.MaintenanceStatus)
+    assert harness.charm._stored.input_hash is None
+    assert harness.charm._stored.config_hash is None
 
 
 def test_on_upgrade_charm(harness, mocker):
@@ -388,6 +445,7 @@ def test_on_install_callback_fail(harness, mocker):
 
 def test_on_config_changed_incomplete(harness, mocker):
     """Test what happens when charm has incomplete configuration."""
+    mocker.patch.object(harness.charm, "get_controller_ca_cert", return_value="ca")
     incomplete_config = {}
     mocker.patch.object(harness.charm, "generate_exporter_config", return_value=incomplete_config)
     mock_apply_config = mocker.patch.object(
@@ -396,28 +454,103 @@ def test_on_config_changed_incomplete(harness, mocker):
 
     harness.charm._on_config_changed(None)
 
-    mock_apply_config.assert_called_once_with(incomplete_config)
+    mock_apply_config.assert_called_once_with(incomplete_config, None)
     assert isinstance(harness.charm.unit.status, charm.BlockedStatus)
 
 
+def test_on_config_changed_error_uses_charm_options(harness, mocker):
+    """Test that snap config options in validation errors are replaced by charm options."""
+    mocker.patch.object(harness.charm, "get_controller_ca_cert", return_value="ca")
+    mocker.patch.object(harness.charm, "generate_exporter_config", return_value={})
+    mocker.patch.object(
+        harness.charm.exporter,
+        "apply_config",
+        side_effect=charm.ExporterConfigError(
+            "Following config options are missing: customer.name, customer.cloud_name, "
+            "juju.username"
+        ),
+    )
+    logger_mock = mocker.patch.object(charm, "logger")
+
+    harness.charm._on_config_changed(None)
+
+    logger_mock.error.assert_called_once_with(
+        "Following config options are missing: customer, cloud-name, juju-user"
+    )
+
+
 def test_on_config_changed_success(mocker, harness):
     """Test successful application of new config values."""
+    mocker.patch.object(harness.charm, "get_controller_ca_cert", return_value="ca")
     valid_config = {"valid": "config"}
     mocker.patch.object(harness.charm, "generate_exporter_config", return_value=valid_config)
     mocker.patch.object(exporter.ExporterSnap, "is_running", return_value=True)
-    mock_apply_config = mocker.patch.object(harness.charm.exporter, "apply_config")
+    mock_apply_config = mocker.patch.object(
+        harness.charm.exporter, "apply_config", return_value="0123456789abcdef"
+    )
     mock_reconfigure_scrape = mocker.patch.object(harness.charm, "reconfigure_scrape_target")
     mock_reconfigure_ports = mocker.patch.object(harness.charm, "reconfigure_open_ports")
 
     harness.charm._on_config_changed(None)
 
-    mock_apply_config.assert_called_once_with(valid_config)
+    mock_apply_config.assert_called_once_with(valid_config, None)
     mock_reconfigure_scrape.assert_called_once_with()
     mock_reconfigure_ports.assert_called_once_with()
 
     assert isinstance(harness.charm.unit.status, charm.ActiveStatus)
 
 
+def test_on_config_changed_unchanged_inputs(mocker, harness):
+    """Test that exporter config is not regenerated if relevant charm options did not change."""
+    mocker.patch.object(harness.charm, "get_controller_ca_cert", return_value="ca")
+    mocker.patch.object(exporter.ExporterSnap, "is_running", return_value=True)
+    mock_generate_config = mocker.patch.object(
+        harness.charm, "generate_exporter_config", return_value={"valid": "config"}
+    )
+    mock_apply_config = mocker.patch.object(
+        harness.charm.exporter, "apply_config", return_value="0123456789abcdef"
+    )
+    mock_reconfigure_scrape = mocker.patch.object(harness.charm, "reconfigure_scrape_target")
+    mocker.patch.object(harness.charm, "reconfigure_open_ports")
+
+    harness.charm._on_config_changed(None)
+    harness.charm._on_config_changed(None)
+
+    mock_generate_config.assert_called_once_with()
+    mock_apply_config.assert_called_once()
+    assert mock_reconfigure_scrape.call_count == 2
+    assert harness.charm._stored.input_hash == harness.charm.config_input_digest()
+
+    with harness.hooks_disabled():
+        harness.update_config({"customer": "New Org"})
+
+    harness.charm._on_config_changed(None)
+
+    assert mock_generate_config.call_count == 2
+
+
+def test_on_config_changed_stores_config_hash(mocker, harness):
+    """Test that digest of the applied config is persisted and passed to next config update."""
+    mocker.patch.object(harness.charm, "get_controller_ca_cert", return_value="ca")
+    valid_config = {"valid": "config"}
+    config_hash = "0123456789abcdef"
+    mocker.patch.object(harness.charm, "generate_exporter_config", return_value=valid_config)
+    mocker.patch.object(exporter.ExporterSnap, "is_running", return_value=False)
+    mock_apply_config = mocker.patch.object(
+        harness.charm.exporter, "apply_config", return_value=config_hash
+    )
+    mocker.patch.object(harness.charm, "reconfigure_scrape_target")
+    mocker.patch.object(harness.charm, "reconfigure_open_ports")
+
+    harness.charm._on_config_changed(None)
+    harness.charm._on_config_changed(None)
+
+    assert harness.charm._stored.config_hash == config_hash
+    mock_apply_config.assert_has_calls(
+        [mock.call(valid_config, None), mock.call(valid_config, config_hash)]
+    )
+
+
 def test_on_prometheus_available(harness, mocker):
     """Test that handler for 'prometheus_available' reconfigures scrape target."""
     mock_reconfigure = mocker.patch.object(harness.charm, "reconfigure_scrape_target")
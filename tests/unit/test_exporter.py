@@ -3,9 +3,10 @@
 #
 # Learn more about testing at: https://juju.is/docs/sdk/testing
 """Unit tests for helper class ExporterSnap that handles actions related to the exporter snap."""
+import os
 import subprocess
 from typing import Dict
-from unittest.mock import ANY, PropertyMock, mock_open, patch
+from unittest.mock import PropertyMock, mock_open, patch
 
 import pytest
 import yaml
@@ -49,12 +50,44 @@ def test_exporter_snap_uninstall(mocker):
 
 def test_validate_config_missing_fields():
     """Test config validation with all required fields missing."""
-    missing_options = ", ".join(exporter.ExporterSnap._REQUIRED_CONFIG)
+    missing_options = ", ".join(
+        [
+            "customer.name",
+            "customer.cloud_name",
+            "juju.controller_endpoint",
+            "juju.controller_cacert",
+            "juju.username",
+            "juju.password",
+            "exporter.port",
+            "exporter.collect_interval",
+            "detection.virt_macs",
+            "detection.match_interfaces",
+        ]
+    )
     expected_err = f"Following config options are missing: {missing_options}"
 
     validate_config_error({}, expected_err)
 
 
+def test_validate_config_partially_missing_fields():
+    """Test config validation with some of the required fields missing."""
+    config = {
+        "customer": {"name": "Test Org"},
+        "juju": {"controller_endpoint": "10.0.0.1:17070", "username": "foo"},
+    }
+    exporter_ = exporter.ExporterSnap()
+
+    assert exporter_._validate_required_options(config) == [
+        "customer.cloud_name",
+        "juju.controller_cacert",
+        "juju.password",
+        "exporter.port",
+        "exporter.collect_interval",
+        "detection.virt_macs",
+        "detection.match_interfaces",
+    ]
+
+
 def test_validate_config_port_not_number():
     """Test config validation when port is not defined as number."""
     config = {"exporter": {"port": "foo"}}
@@ -76,6 +109,27 @@ def test_validate_config_port_out_of_range(port):
     validate_config_error({"exporter": {"port": port}}, expected_error)
 
 
+@pytest.mark.parametrize(
+    "value, expected_value",
+    [
+        (5000, 5000),
+        ("5000", 5000),
+        (" 5000 ", 5000),
+        ("+5000", 5000),
+        ("-1", -1),
+        ("--1", None),
+        ("+", None),
+        ("5.0", None),
+        (5.0, None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_to_int(value, expected_value):
+    """Test conversion of numeric config values to integers."""
+    assert exporter._to_int(value) == expected_value
+
+
 def test_validate_configrefresh_not_number():
     """Test config validation when 'refresh' option is not a number."""
     expected_err = "Configuration option 'collect_interval' must be a number."
@@ -88,6 +142,22 @@ def test_validate_config_refresh_below_zero():
     validate_config_error({"exporter": {"collect_interval": 0}}, expected_err)
 
 
+def test_validate_config_multiple_errors():
+    """Test that all validation errors are reported, one per line."""
+    config = {"exporter": {"port": "foo", "collect_interval": 0}}
+    exporter_ = exporter.ExporterSnap()
+
+    with pytest.raises(exporter.ExporterConfigError) as exc:
+        exporter_.validate_config(config)
+
+    errors = str(exc.value).split(os.linesep)
+    assert len(errors) == 3
+    assert errors[1:] == [
+        "Configuration option 'port' must be a number.",
+        "Configuration option 'collect_interval' must be a positive number.",
+    ]
+
+
 def test_validate_config():
     """Test positively validating snap exporter config."""
     config = {
@@ -117,25 +187,56 @@ def test_validate_config():
         pytest.fail("Configuration expected to pass but did not.")
 
 
+def test_render_config():
+    """Test that rendered config is yaml with a digest that depends only on its content."""
+    config = {"exporter": {"port": 5000}, "debug": False}
+
+    config_data, config_hash = exporter.ExporterSnap.render_config(config)
+
+    assert yaml.safe_load(config_data.decode("utf-8")) == config
+    assert exporter.ExporterSnap.render_config(dict(config)) == (config_data, config_hash)
+    assert exporter.ExporterSnap.render_config({"debug": True})[1] != config_hash
+
+
 def test_apply_config_success(mocker):
     """Test successfully applying snap configuration."""
     mock_stop = mocker.patch.object(exporter.ExporterSnap, "stop")
     mock_start = mocker.patch.object(exporter.ExporterSnap, "restart")
-    mock_dump = mocker.patch.object(exporter.yaml, "safe_dump")
     mock_validate = mocker.patch.object(exporter.ExporterSnap, "validate_config")
     config = {"valid": "config"}
+    config_data, config_hash = exporter.ExporterSnap.render_config(config)
     exporter_ = exporter.ExporterSnap()
 
     with patch("builtins.open", new_callable=mock_open) as file_:
-        exporter_.apply_config(config)
+        assert exporter_.apply_config(config) == config_hash
 
         mock_stop.assert_called_once_with()
         mock_validate.assert_called_once_with(config)
-        mock_dump.assert_called_once_with(config, ANY)
-        file_.assert_called_once_with(exporter_.SNAP_CONFIG_PATH, "w", encoding="utf-8")
+        file_.assert_called_once_with(exporter_.SNAP_CONFIG_PATH, "wb")
+        file_().write.assert_called_once_with(config_data)
         mock_start.assert_called_once_with()
 
 
+@pytest.mark.parametrize("running", [True, False])
+def test_apply_config_unchanged(running, mocker):
+    """Test that unchanged config is not re-applied while the exporter service is running."""
+    mock_stop = mocker.patch.object(exporter.ExporterSnap, "stop")
+    mock_start = mocker.patch.object(exporter.ExporterSnap, "restart")
+    mocker.patch.object(exporter.ExporterSnap, "is_running", return_value=running)
+    mock_validate = mocker.patch.object(exporter.ExporterSnap, "validate_config")
+    config = {"valid": "config"}
+    _, config_hash = exporter.ExporterSnap.render_config(config)
+    exporter_ = exporter.ExporterSnap()
+
+    with patch("builtins.open", new_callable=mock_open) as file_:
+        assert exporter_.apply_config(config, config_hash) == config_hash
+
+    assert file_.called is not running
+    assert mock_stop.called is not running
+    assert mock_start.called is not running
+    mock_validate.assert_not_called()
+
+
 def test_apply_config_fail(mocker):
     """Test failure to apply snap configuration.
 
@@ -144,19 +245,18 @@ def test_apply_config_fail(mocker):
     """
     mock_stop = mocker.patch.object(exporter.ExporterSnap, "stop")
     mock_start = mocker.patch.object(exporter.ExporterSnap, "restart")
-    mock_dump = mocker.patch.object(exporter.yaml, "safe_dump")
     mock_validate = mocker.patch.object(exporter.ExporterSnap, "validate_config")
     config = {}
     exporter_ = exporter.ExporterSnap()
 
     mock_validate.side_effect = exporter.ExporterConfigError
-    with patch("builtins.open", new_callable=mock_open):
+    with patch("builtins.open", new_callable=mock_open) as file_:
         with pytest.raises(exporter.ExporterConfigError):
             exporter_.apply_config(config)
 
     mock_stop.assert_called_once_with()
     mock_validate.assert_called_once_with(config)
-    mock_dump.assert_not_called()
+    file_.assert_not_called()
     mock_start.assert_not_called()
 
 